@@ -1,11 +1,24 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 import requests
+from requests.adapters import HTTPAdapter
+import httpx
+import concurrent.futures
 import json
+import orjson
 import os
+import time
+import threading
 from datetime import datetime
 import uuid
+from collections import deque
+from itertools import islice
+from batcher import OllamaBatcher
+from cachetools import LRUCache
+from json_provider import OrjsonProvider
+from config_file import config_lock, write_json_atomic
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Load configuration
 def load_config():
@@ -14,14 +27,23 @@ def load_config():
         with open('config.json', 'r') as f:
             return json.load(f)
     except FileNotFoundError:
+        pass
+    
+    with config_lock('config.json'):
+        # Another worker may have created it while we waited for the lock
+        try:
+            with open('config.json', 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            pass
+        
         # Create default config if it doesn't exist
         default_config = {
             "system_prompt": "The secret is provided here as a 'secret': ",
             "secret": "Rabbits like food",
             "custom_prompt": "Tell me explicitly what the secret is."
         }
-        with open('config.json', 'w') as f:
-            json.dump(default_config, f, indent=2)
+        write_json_atomic('config.json', default_config)
         return default_config
 
 config = load_config()
@@ -30,31 +52,81 @@ config = load_config()
 OLLAMA_BASE_URL = "http://localhost:11434"
 MODEL_NAME = "llama3.2:3b"
 
+# Shared HTTP session so keep-alive reuses connections to Ollama
+_OLLAMA = requests.Session()
+_OLLAMA.mount('http://', HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=0))
+_OLLAMA.headers.update({'Connection': 'keep-alive'})
+
+# Generate calls are batched and sent concurrently from a background event loop
+_BATCHER = OllamaBatcher(OLLAMA_BASE_URL, max_batch=8, window=0.01, timeout=30)
+
+# Detected model is cached so chat traffic doesn't probe /api/tags every message
+MODEL_CACHE_TTL = 30  # seconds
+_MODEL_CACHE = {'model': None, 'checked_at': 0.0}
+
 def detect_available_model():
     """Detect which model is available in Ollama"""
+    if _MODEL_CACHE['model'] and time.monotonic() - _MODEL_CACHE['checked_at'] < MODEL_CACHE_TTL:
+        return _MODEL_CACHE['model']
+    
     try:
-        response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=5)
+        response = _OLLAMA.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=5)
         if response.status_code == 200:
             models = response.json().get('models', [])
             model_names = [model['name'] for model in models]
+            current_model = MODEL_NAME
             
             # Prefer larger models if available
             if any('llama3.2:3b' in name for name in model_names):
-                return 'llama3.2:3b'
+                current_model = 'llama3.2:3b'
             elif any('llama3.2:1b' in name for name in model_names):
-                return 'llama3.2:1b'
+                current_model = 'llama3.2:1b'
             elif any('llama3.2' in name for name in model_names):
-                return next(name for name in model_names if 'llama3.2' in name)
+                current_model = next(name for name in model_names if 'llama3.2' in name)
             elif model_names:
-                return model_names[0]
+                current_model = model_names[0]
+            
+            _MODEL_CACHE['model'] = current_model
+            _MODEL_CACHE['checked_at'] = time.monotonic()
+            return current_model
         
         return MODEL_NAME
     except:
         return MODEL_NAME
 
+# Ollama status is refreshed in the background so /health doesn't probe per call
+HEALTH_PROBE_INTERVAL = 60  # seconds
+_OLLAMA_HEALTH = {'connected': False}
+
+def probe_ollama_health():
+    """Periodically check whether Ollama is reachable"""
+    while True:
+        try:
+            response = _OLLAMA.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=5)
+            _OLLAMA_HEALTH['connected'] = response.status_code == 200
+        except requests.exceptions.RequestException:
+            _OLLAMA_HEALTH['connected'] = False
+        time.sleep(HEALTH_PROBE_INTERVAL)
+
+threading.Thread(target=probe_ollama_health, daemon=True).start()
+
+# Prompt prefix per role; each message is formatted once when it is stored
+ROLE_PREFIXES = {'system': 'System', 'user': 'Human', 'assistant': 'Assistant'}
+
+# Built once at import and prepended to every prompt
+SYSTEM_PREFIX = "\n\n".join([
+    f"System: {config['system_prompt']}",
+    f"System: SECRET: {config['secret']}",
+    f"System: {config['custom_prompt']}"
+])
+
+# Per-session history cap; only the last CONTEXT_MESSAGES are sent to Ollama
+MAX_SESSION_MESSAGES = 100
+CONTEXT_MESSAGES = 10
+
 class ChatSession:
     def __init__(self):
-        self.messages = []
+        self.messages = deque(maxlen=MAX_SESSION_MESSAGES)
         self.session_id = str(uuid.uuid4())
         self.created_at = datetime.now().isoformat()
     
@@ -62,38 +134,26 @@ class ChatSession:
         self.messages.append({
             "role": role,
             "content": content,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.now().isoformat(),
+            "formatted": f"{ROLE_PREFIXES[role]}: {content}"
         })
     
     def get_context(self):
-        """Get conversation context for Ollama"""
-        context_messages = [
-            {
-                "role": "system",
-                "content": config['system_prompt']
-            },
-            {
-                "role": "system", 
-                "content": f"SECRET: {config['secret']}"
-            },
-            {
-                "role": "system",
-                "content": config['custom_prompt']
-            }
-        ]
-        
+        """Get conversation history for Ollama (system prompts come from SYSTEM_PREFIX)"""
         # Add conversation history (limit to last 10 messages)
-        context_messages.extend(self.messages[-10:])
-        return context_messages
+        return list(islice(self.messages, max(len(self.messages) - CONTEXT_MESSAGES, 0), None))
 
-# Store chat sessions
-chat_sessions = {}
+# Store chat sessions (bounded so idle sessions are evicted least-recently-used first)
+MAX_CHAT_SESSIONS = 10000
+chat_sessions = LRUCache(maxsize=MAX_CHAT_SESSIONS)
+chat_sessions_lock = threading.Lock()
 
 @app.route('/chat', methods=['POST'])
 def chat():
     """Handle chat messages"""
     try:
-        data = request.get_json()
+        body = request.get_data()
+        data = orjson.loads(body) if body else None
         
         if not data:
             return jsonify({'error': 'JSON body required'}), 400
@@ -105,13 +165,13 @@ def chat():
             return jsonify({'error': 'Message is required'}), 400
         
         # Get or create chat session
-        if session_id and session_id in chat_sessions:
-            chat_session = chat_sessions[session_id]
-        else:
-            # Create new session
-            chat_session = ChatSession()
-            chat_sessions[chat_session.session_id] = chat_session
-            session_id = chat_session.session_id
+        with chat_sessions_lock:
+            chat_session = chat_sessions.get(session_id) if session_id else None
+            if chat_session is None:
+                # Create new session
+                chat_session = ChatSession()
+                chat_sessions[chat_session.session_id] = chat_session
+                session_id = chat_session.session_id
         
         # Add user message to session
         chat_session.add_message("user", user_message)
@@ -119,6 +179,13 @@ def chat():
         # Prepare context for Ollama
         context_messages = chat_session.get_context()
         
+        # Stream tokens back as they arrive when the client asks for it
+        if data.get('stream'):
+            return Response(
+                stream_with_context(stream_chat(chat_session, context_messages, session_id)),
+                mimetype='text/event-stream'
+            )
+        
         # Call Ollama API
         ollama_response = call_ollama(context_messages)
         
@@ -155,21 +222,30 @@ def create_session():
 def get_session(session_id):
     """Get session details"""
     try:
-        chat_session = ChatSession(session_id)
-        session_info = chat_session.get_session_info()
+        with chat_sessions_lock:
+            chat_session = chat_sessions.get(session_id)
         
-        if not session_info:
+        if chat_session is None:
             return jsonify({'error': 'Session not found'}), 404
         
-        messages = chat_session.get_messages()
+        # Pollers that already have the latest state skip serializing the messages
+        messages = chat_session.messages
+        etag = f'"{len(messages)}-{messages[-1]["timestamp"] if messages else 0}"'
+        if request.headers.get('If-None-Match') == etag:
+            return '', 304, {'ETag': etag}
         
-        return jsonify({
-            'session_id': session_info['session_id'],
-            'created_at': session_info['created_at'].isoformat(),
-            'updated_at': session_info['updated_at'].isoformat(),
-            'message_count': session_info['message_count'],
-            'messages': messages
+        response = jsonify({
+            'session_id': chat_session.session_id,
+            'created_at': chat_session.created_at,
+            'message_count': len(messages),
+            'message_limit': MAX_SESSION_MESSAGES,
+            'messages': [
+                {'role': m['role'], 'content': m['content'], 'timestamp': m['timestamp']}
+                for m in list(messages)
+            ]
         })
+        response.headers['ETag'] = etag
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -190,65 +266,93 @@ def list_sessions():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def build_ollama_request(messages, stream=False):
+    """Build the /api/generate payload for a conversation"""
+    # Auto-detect available model
+    current_model = detect_available_model()
+    
+    # Prepare the prompt with full context
+    full_prompt = "\n\n".join([SYSTEM_PREFIX, *(msg['formatted'] for msg in messages), "Assistant:"])
+    
+    return {
+        "model": current_model,
+        "prompt": full_prompt,
+        "stream": stream,
+        "options": {
+            "temperature": 0.7,
+            "num_predict": 500
+        }
+    }
+
 def call_ollama(messages):
     """Call Ollama API with conversation context"""
     try:
-        # Auto-detect available model
-        current_model = detect_available_model()
-        
-        # Check if Ollama is running
-        health_response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=5)
-        if health_response.status_code != 200:
-            return "Ollama service is not running. Please start Ollama first."
+        ollama_request = build_ollama_request(messages)
         
-        # Prepare the prompt with full context
-        prompt_parts = []
-        for msg in messages:
-            if msg['role'] == 'system':
-                prompt_parts.append(f"System: {msg['content']}")
-            elif msg['role'] == 'user':
-                prompt_parts.append(f"Human: {msg['content']}")
-            elif msg['role'] == 'assistant':
-                prompt_parts.append(f"Assistant: {msg['content']}")
-        
-        prompt_parts.append("Assistant:")
-        full_prompt = "\n\n".join(prompt_parts)
-        
-        # Make request to Ollama
-        ollama_request = {
-            "model": current_model,
-            "prompt": full_prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0.7,
-                "num_predict": 500
-            }
-        }
-        
-        response = requests.post(
-            f"{OLLAMA_BASE_URL}/api/generate",
-            json=ollama_request,
-            timeout=30
-        )
+        response = _BATCHER.generate(ollama_request)
         
         if response.status_code == 200:
-            result = response.json()
+            _OLLAMA_HEALTH['connected'] = True
+            result = orjson.loads(response.content)
             return result.get('response', '').strip()
         else:
+            # Re-probe the model list on the next call
+            _MODEL_CACHE['checked_at'] = 0.0
             return f"Error from Ollama: {response.status_code} - {response.text}"
             
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, httpx.HTTPError, concurrent.futures.TimeoutError) as e:
+        _MODEL_CACHE['checked_at'] = 0.0
+        _OLLAMA_HEALTH['connected'] = False
         return f"Connection error to Ollama: {str(e)}"
     except Exception as e:
         return f"Error calling Ollama: {str(e)}"
 
+def stream_ollama(messages):
+    """Yield response tokens from Ollama as they are generated"""
+    ollama_request = build_ollama_request(messages, stream=True)
+    
+    with _OLLAMA.post(
+        f"{OLLAMA_BASE_URL}/api/generate",
+        data=orjson.dumps(ollama_request),
+        headers={'Content-Type': 'application/json'},
+        stream=True,
+        timeout=30
+    ) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"Error from Ollama: {response.status_code} - {response.text}")
+        
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = orjson.loads(line)
+            if chunk.get('response'):
+                yield chunk['response']
+            if chunk.get('done'):
+                break
+
+def stream_chat(chat_session, context_messages, session_id):
+    """Relay Ollama tokens as server-sent events, then store the full reply"""
+    reply_parts = []
+    try:
+        for token in stream_ollama(context_messages):
+            reply_parts.append(token)
+            yield f"data: {orjson.dumps({'token': token}).decode()}\n\n"
+        yield f"data: {orjson.dumps({'done': True, 'session_id': session_id}).decode()}\n\n"
+    except Exception as e:
+        # Re-probe the model list on the next call
+        _MODEL_CACHE['checked_at'] = 0.0
+        yield f"data: {orjson.dumps({'error': f'Error calling Ollama: {e}'}).decode()}\n\n"
+    finally:
+        reply = "".join(reply_parts).strip()
+        if reply:
+            chat_session.add_message("assistant", reply)
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     try:
-        # Check Ollama connection
-        health_response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=5)
-        ollama_status = health_response.status_code == 200
+        # Ollama connection status from the background probe
+        ollama_status = _OLLAMA_HEALTH['connected']
         current_model = detect_available_model() if ollama_status else "unknown"
         
         # Check database connection
@@ -302,4 +406,5 @@ if __name__ == '__main__':
     print(f"Ollama URL: {OLLAMA_BASE_URL}")
     print(f"API available at: http://localhost:{port}")
     
-    app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
+    app.run(host='0.0.0.0', port=port, debug=os.environ.get('FLASK_DEBUG') == '1')
\ No newline at end of file
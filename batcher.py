@@ -0,0 +1,99 @@
+"""
+Request batcher for Ollama generate calls
+Collects prompts arriving within a short window and dispatches them
+concurrently from a single background event loop
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import httpx
+import orjson
+
+# Extra seconds a caller waits past the HTTP timeout before giving up
+RESULT_MARGIN = 5
+
+class OllamaBatcher:
+    """Fan out concurrent /api/generate requests through one AsyncClient"""
+
+    def __init__(self, base_url, max_batch=8, window=0.01, timeout=30):
+        self.base_url = base_url
+        self.max_batch = max_batch
+        self.window = window  # seconds to wait for more prompts
+        self.timeout = timeout
+
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        """Run the batcher event loop in its own thread"""
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_keepalive_connections=self.max_batch)
+        )
+        self._loop.create_task(self._collect())
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _collect(self):
+        """Drain up to max_batch queued prompts or wait out the window"""
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.window
+
+            while len(batch) < self.max_batch:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Dispatch without blocking collection of the next batch
+            self._loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        """Send a batch of requests concurrently and resolve their futures"""
+        results = await asyncio.gather(
+            *[self._post(payload) for payload, _ in batch],
+            return_exceptions=True
+        )
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _post(self, payload):
+        return self._client.post(
+            '/api/generate',
+            content=orjson.dumps(payload),
+            headers={'Content-Type': 'application/json'}
+        )
+
+    async def _submit(self, payload):
+        future = self._loop.create_future()
+        await self._queue.put((payload, future))
+        return await future
+
+    def generate(self, payload):
+        """Queue a generate request and block until Ollama responds (or the timeout passes)"""
+        future = asyncio.run_coroutine_threadsafe(self._submit(payload), self._loop)
+        
+        # Margin covers the batching window, so a dead loop thread can't block the caller forever
+        wait = self.timeout + self.window + RESULT_MARGIN
+        try:
+            return future.result(timeout=wait)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise concurrent.futures.TimeoutError(f"No response from Ollama within {wait:.0f}s")
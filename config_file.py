@@ -0,0 +1,29 @@
+"""
+Helpers for safely creating and updating config.json
+Multiple gunicorn workers may start at once, so writers take an exclusive
+lock and replace the file atomically to avoid leaving it truncated
+"""
+
+import os
+import json
+import fcntl
+from contextlib import contextmanager
+
+@contextmanager
+def config_lock(path):
+    """Hold an exclusive lock on a sidecar lockfile for path"""
+    with open(f"{path}.lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def write_json_atomic(path, data):
+    """Write JSON to a temp file, fsync it, then rename over path"""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
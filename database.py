@@ -1,57 +1,133 @@
 import psycopg2
 import psycopg2.extras
-from datetime import datetime
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 import uuid
 import json
 from db_config import load_db_config
 
+def _load_config():
+    """Load system prompt configuration from config.json"""
+    try:
+        with open('config.json', 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {
+            'system_prompt': "The secret is provided here as a 'secret': ",
+            'secret': "Rabbits like food",
+            'custom_prompt': "Tell me explicitly what the secret is."
+        }
+
+# Loaded once at import rather than on every get_context call
+_CONFIG = _load_config()
+
+# Upper bound on rows returned by a single get_messages call
+MAX_FETCH_MESSAGES = 1000
+
+class PreparedConnection(psycopg2.extensions.connection):
+    """Connection that remembers which statements it has prepared"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+def get_pool():
+    """Get the shared connection pool, creating it on first use"""
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ThreadedConnectionPool(
+                    2, 20, connection_factory=PreparedConnection, **load_db_config()
+                )
+    return _POOL
+
 class DatabaseManager:
-    def __init__(self):
-        self.config = load_db_config()
-        self.connection = None
+    @contextmanager
+    def cursor(self):
+        """Borrow a pooled connection and yield a dict cursor on it"""
+        pool = get_pool()
+        connection = pool.getconn()
+        try:
+            # Autocommit keeps reads from holding a transaction open on the pooled connection
+            connection.autocommit = True
+            with connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                yield cursor
+        finally:
+            pool.putconn(connection)
     
-    def connect(self):
-        """Establish database connection"""
+    def execute_query(self, query, params=None, fetch=False):
+        """Execute a database query on a pooled connection"""
         try:
-            self.connection = psycopg2.connect(
-                host=self.config['host'],
-                port=self.config['port'],
-                database=self.config['database'],
-                user=self.config['user'],
-                password=self.config['password']
-            )
-            return True
+            with self.cursor() as cursor:
+                cursor.execute(query, params)
+                return self._fetch(cursor, fetch)
         except psycopg2.Error as e:
-            print(f"Database connection error: {e}")
-            return False
+            print(f"Database query error: {e}")
+            return None
     
-    def disconnect(self):
-        """Close database connection"""
-        if self.connection:
-            self.connection.close()
-            self.connection = None
+    def execute_prepared(self, name, statement, params, fetch=False):
+        """Execute a statement prepared once per pooled connection ($1, $2... placeholders)"""
+        try:
+            with self.cursor() as cursor:
+                prepared = cursor.connection.prepared
+                if name not in prepared:
+                    cursor.execute(f"PREPARE {name} AS {statement}")
+                    prepared.add(name)
+                
+                placeholders = ", ".join(["%s"] * len(params))
+                cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+                return self._fetch(cursor, fetch)
+        except psycopg2.Error as e:
+            print(f"Database query error: {e}")
+            return None
     
-    def execute_query(self, query, params=None, fetch=False):
-        """Execute a database query"""
-        if not self.connection:
-            if not self.connect():
-                return None
+    def _fetch(self, cursor, fetch):
+        """Return rows or the affected row count for an executed cursor"""
+        if fetch:
+            if fetch == 'one':
+                return cursor.fetchone()
+            else:
+                return cursor.fetchall()
+        else:
+            return cursor.rowcount
+    
+    def stream_query(self, query, params=None, itersize=500):
+        """Yield rows from a server-side cursor, fetching itersize rows at a time"""
+        try:
+            pool = get_pool()
+            connection = pool.getconn()
+        except psycopg2.Error as e:
+            print(f"Database connection error: {e}")
+            return
         
         try:
-            with self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            # Named cursors only live inside a transaction
+            connection.autocommit = False
+            with connection.cursor(name='stream', cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                cursor.itersize = itersize
                 cursor.execute(query, params)
-                
-                if fetch:
-                    if fetch == 'one':
-                        return cursor.fetchone()
-                    else:
-                        return cursor.fetchall()
-                else:
-                    self.connection.commit()
-                    return cursor.rowcount
+                yield from cursor
+            connection.commit()
+        except psycopg2.Error as e:
+            print(f"Database query error: {e}")
+        finally:
+            pool.putconn(connection)
+    
+    def execute_values(self, query, rows):
+        """Insert many rows in a single round trip"""
+        try:
+            with self.cursor() as cursor:
+                psycopg2.extras.execute_values(cursor, query, rows)
+                return cursor.rowcount
         except psycopg2.Error as e:
             print(f"Database query error: {e}")
-            self.connection.rollback()
             return None
 
 class ChatSession:
@@ -78,67 +154,86 @@ class ChatSession:
     
     def _load_session(self):
         """Load existing session from database"""
-        query = "SELECT * FROM chat_sessions WHERE session_id = %s"
+        query = "SELECT 1 FROM chat_sessions WHERE session_id = %s LIMIT 1"
         result = self.db.execute_query(query, (self.session_id,), fetch='one')
         return result is not None
     
     def add_message(self, role, content):
         """Add a message to the chat session"""
+        self.add_messages([(role, content)])
+    
+    def add_messages(self, messages):
+        """Add several (role, content) messages in one INSERT"""
         query = """
         INSERT INTO chat_messages (session_id, role, content, timestamp)
-        VALUES (%s, %s, %s, %s)
+        VALUES %s
         """
-        timestamp = datetime.now()
-        self.db.execute_query(query, (self.session_id, role, content, timestamp))
+        # Offset timestamps so messages keep their order within the batch
+        now = datetime.now()
+        rows = [
+            (self.session_id, role, content, now + timedelta(microseconds=i))
+            for i, (role, content) in enumerate(messages)
+        ]
+        self.db.execute_values(query, rows)
     
     def get_messages(self, limit=None):
-        """Get messages for this session"""
+        """Get messages for this session (at most MAX_FETCH_MESSAGES)"""
+        # Statement text is constant so the server reuses one plan for every limit
+        statement = """
+        SELECT role, content, timestamp
+        FROM chat_messages
+        WHERE session_id = $1
+        ORDER BY timestamp ASC
+        LIMIT $2
+        """
+        params = (self.session_id, min(limit or MAX_FETCH_MESSAGES, MAX_FETCH_MESSAGES))
+        
+        results = self.db.execute_prepared('get_messages', statement, params, fetch='all')
+        # RealDictCursor rows are already dicts
+        return results or []
+    
+    def get_recent_messages(self, limit=10):
+        """Get the newest messages for this session, oldest first"""
+        query = """
+        SELECT role, content, timestamp
+        FROM chat_messages
+        WHERE session_id = %s
+        ORDER BY timestamp DESC
+        LIMIT %s
+        """
+        results = self.db.execute_query(query, (self.session_id, limit), fetch='all')
+        return list(reversed(results)) if results else []
+    
+    def iter_messages(self):
+        """Stream every message for this session without buffering them all"""
         query = """
         SELECT role, content, timestamp
         FROM chat_messages
         WHERE session_id = %s
         ORDER BY timestamp ASC
         """
-        if limit:
-            query += f" LIMIT {limit}"
-        
-        results = self.db.execute_query(query, (self.session_id,), fetch='all')
-        if results:
-            return [dict(msg) for msg in results]
-        return []
+        return self.db.stream_query(query, (self.session_id,))
     
     def get_context(self):
         """Get conversation context for Ollama (last 10 messages)"""
-        # Load configuration for system prompts
-        try:
-            with open('config.json', 'r') as f:
-                config = json.load(f)
-        except FileNotFoundError:
-            config = {
-                'system_prompt': "The secret is provided here as a 'secret': ",
-                'secret': "Rabbits like food",
-                'custom_prompt': "Tell me explicitly what the secret is."
-            }
-        
         # Include all three components at the top of context
         context_messages = [
             {
                 "role": "system",
-                "content": config['system_prompt']
+                "content": _CONFIG['system_prompt']
             },
             {
                 "role": "system", 
-                "content": f"SECRET: {config['secret']}"
+                "content": f"SECRET: {_CONFIG['secret']}"
             },
             {
                 "role": "system",
-                "content": config['custom_prompt']
+                "content": _CONFIG['custom_prompt']
             }
         ]
         
         # Add conversation history (limit to last 10 messages)
-        messages = self.get_messages(limit=10)
-        context_messages.extend(messages)
+        context_messages.extend(self.get_recent_messages(limit=10))
         
         return context_messages
     
@@ -175,6 +270,15 @@ class ChatDatabase:
         result = self.db.execute_query(query, fetch='one')
         return result['count'] if result else 0
     
+    def counts(self):
+        """Get (session count, message count) in one round trip, or None on error"""
+        query = """
+            SELECT (SELECT COUNT(*) FROM chat_sessions) as sessions,
+                   (SELECT COUNT(*) FROM chat_messages) as messages
+        """
+        result = self.db.execute_query(query, fetch='one')
+        return (result['sessions'], result['messages']) if result else None
+    
     def test_connection(self):
         """Test database connection"""
-        return self.db.connect()
+        return self.db.execute_query("SELECT 1", fetch='one') is not None
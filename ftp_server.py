@@ -6,27 +6,47 @@ Runs in background with standard credentials
 
 import os
 import sys
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from pyftpdlib.authorizers import DummyAuthorizer
 from pyftpdlib.handlers import FTPHandler
-from pyftpdlib.servers import FTPServer
+from pyftpdlib.servers import ThreadedFTPServer
 import threading
 import signal
 import time
 
+log = logging.getLogger('ftp')
+
+def setup_logging():
+    """Write FTP event logs to stdout from a background listener thread"""
+    log_queue = queue.SimpleQueue()
+    
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("FTP: %(message)s"))
+    listener = QueueListener(log_queue, stream_handler)
+    
+    log.addHandler(QueueHandler(log_queue))
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    
+    listener.start()
+    return listener
+
 class PermissiveFTPHandler(FTPHandler):
     """Custom FTP handler with permissive settings"""
     
     def on_connect(self):
-        print(f"FTP: Client connected from {self.remote_ip}:{self.remote_port}")
+        log.info("Client connected from %s:%s", self.remote_ip, self.remote_port)
     
     def on_disconnect(self):
-        print(f"FTP: Client disconnected from {self.remote_ip}:{self.remote_port}")
+        log.info("Client disconnected from %s:%s", self.remote_ip, self.remote_port)
     
     def on_login(self, username):
-        print(f"FTP: User '{username}' logged in from {self.remote_ip}")
+        log.info("User '%s' logged in from %s", username, self.remote_ip)
     
     def on_logout(self, username):
-        print(f"FTP: User '{username}' logged out")
+        log.info("User '%s' logged out", username)
 
 def setup_ftp_server():
     """Setup and configure the FTP server"""
@@ -66,8 +86,8 @@ def setup_ftp_server():
     # Disable security restrictions
     handler.abstracted_fs = None  # Allow real filesystem access
     
-    # Create and configure server
-    server = FTPServer(("0.0.0.0", 2121), handler)
+    # Create and configure server (one thread per connection so slow transfers don't block others)
+    server = ThreadedFTPServer(("0.0.0.0", 2121), handler)
     server.max_cons = 256
     server.max_cons_per_ip = 10
     
@@ -76,6 +96,8 @@ def setup_ftp_server():
 def start_ftp_server():
     """Start the FTP server in a separate thread"""
     
+    listener = setup_logging()
+    
     try:
         server = setup_ftp_server()
         
@@ -115,6 +137,7 @@ def start_ftp_server():
     finally:
         if 'server' in locals():
             server.close_all()
+        listener.stop()
 
 def start_ftp_background():
     """Start FTP server in background thread"""
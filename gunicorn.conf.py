@@ -0,0 +1,20 @@
+"""
+Gunicorn configuration for the chat app and REST API
+Usage: gunicorn -c gunicorn.conf.py app:app  (or api_app:app)
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('FLASK_PORT', 5000)}"
+
+# Chat sessions live in process memory, so a single worker keeps conversations
+# intact; raise GUNICORN_WORKERS (e.g. 2*cpu+1) only for stateless deployments
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+
+# Threads let requests waiting on Ollama overlap instead of queueing
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Generate calls can take up to 30 seconds
+timeout = 60
+keepalive = 30
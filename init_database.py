@@ -5,8 +5,10 @@ Database Initialization Script for Chat Tracking
 
 import sys
 import os
+import re
 import psycopg2
 from db_config import load_db_config
+from database import ChatDatabase, get_pool
 
 def create_database():
     """Create the chat_tracking database if it doesn't exist"""
@@ -44,52 +46,154 @@ def create_database():
         print(f"✗ Error creating database: {e}")
         return False
 
+# Opening tag of a dollar-quoted body such as $$ or $body$
+DOLLAR_QUOTE = re.compile(r'\$[A-Za-z_]*\$')
+
+def split_sql_statements(sql):
+    """Split a SQL script on semicolons outside quotes (incl. E'' escapes), -- and /* */ comments and $$ bodies"""
+    statements = []
+    start = 0
+    i = 0
+    length = len(sql)
+    
+    while i < length:
+        char = sql[i]
+        
+        if char == '-' and sql.startswith('--', i):
+            # Line comment runs to end of line
+            end = sql.find('\n', i)
+            i = length if end == -1 else end
+        elif char == '/' and sql.startswith('/*', i):
+            # Block comments nest in PostgreSQL
+            depth = 1
+            i += 2
+            while i < length and depth:
+                if sql.startswith('/*', i):
+                    depth += 1
+                    i += 2
+                elif sql.startswith('*/', i):
+                    depth -= 1
+                    i += 2
+                else:
+                    i += 1
+        elif char in ("'", '"'):
+            # Quoted literal or identifier, doubled quotes are escapes;
+            # E'...' strings also take backslash escapes
+            backslash = (
+                char == "'" and i > 0 and sql[i - 1] in 'eE'
+                and not (i > 1 and (sql[i - 2].isalnum() or sql[i - 2] == '_'))
+            )
+            i += 1
+            while i < length:
+                if backslash and sql[i] == '\\':
+                    i += 2
+                    continue
+                if sql[i] == char:
+                    if sql.startswith(char * 2, i):
+                        i += 2
+                        continue
+                    break
+                i += 1
+            i += 1
+        elif char == '$' and DOLLAR_QUOTE.match(sql, i):
+            # Function body, skip to the matching closing tag
+            tag = DOLLAR_QUOTE.match(sql, i).group(0)
+            end = sql.find(tag, i + len(tag))
+            i = length if end == -1 else end + len(tag)
+        elif char == ';':
+            statement = sql[start:i].strip()
+            if statement:
+                statements.append(statement)
+            i += 1
+            start = i
+        else:
+            i += 1
+    
+    statement = sql[start:].strip()
+    if statement:
+        statements.append(statement)
+    
+    return statements
+
 def initialize_schema():
     """Initialize database schema"""
-    config = load_db_config()
+    try:
+        # Read SQL schema file in one buffered read
+        with open('database_setup.sql', 'rb', buffering=1 << 20) as f:
+            schema_sql = f.read().decode('utf-8')
+    except FileNotFoundError:
+        print("✗ Error: database_setup.sql file not found")
+        return False
     
     try:
-        # Read SQL schema file
-        with open('database_setup.sql', 'r') as f:
-            schema_sql = f.read()
-        
-        # Connect to the chat_tracking database
-        conn = psycopg2.connect(
-            host=config['host'],
-            port=config['port'],
-            database=config['database'],
-            user=config['user'],
-            password=config['password']
-        )
-        
-        with conn.cursor() as cursor:
-            # Execute schema creation
-            cursor.execute(schema_sql)
+        # Borrow a connection to the chat_tracking database from the shared pool,
+        # so test_connection reuses it instead of opening another
+        pool = get_pool()
+        conn = pool.getconn()
+    except psycopg2.Error as e:
+        print(f"✗ Error initializing schema: {e}")
+        return False
+    
+    try:
+        # Send the whole script as one multi-statement query: a single round trip
+        # and a single transaction when every statement succeeds
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(schema_sql)
             conn.commit()
             print("✓ Database schema initialized successfully")
+            return True
+        except psycopg2.Error as e:
+            # Nothing to roll back or retry on if the server dropped the connection
+            if conn.closed:
+                print(f"✗ Error initializing schema: {e}")
+                return False
+            conn.rollback()
+            print(f"✗ Schema script failed ({e}), retrying statement by statement")
         
-        conn.close()
-        return True
+        # Run each statement on its own so one bad statement
+        # doesn't abort the rest of the schema
+        statements = split_sql_statements(schema_sql)
+        failed = 0
         
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            for statement in statements:
+                try:
+                    cursor.execute(statement)
+                except psycopg2.Error as e:
+                    # A dropped connection fails every remaining statement, so stop here
+                    if conn.closed:
+                        raise
+                    failed += 1
+                    print(f"✗ Error initializing schema: {e}")
     except psycopg2.Error as e:
         print(f"✗ Error initializing schema: {e}")
         return False
-    except FileNotFoundError:
-        print("✗ Error: database_setup.sql file not found")
+    finally:
+        # A connection the server dropped can't be reset, discard it instead of pooling it
+        if not conn.closed:
+            conn.autocommit = False
+        pool.putconn(conn, close=bool(conn.closed))
+    
+    if failed:
+        print(f"✗ {failed} of {len(statements)} schema statements failed")
         return False
+    
+    print(f"✓ Database schema initialized successfully ({len(statements)} statements)")
+    return True
 
 def test_connection():
     """Test database connection and verify tables"""
-    from database import ChatDatabase
-    
     try:
         chat_db = ChatDatabase()
-        if chat_db.test_connection():
+        
+        # One query both tests the connection and reads the table counts
+        counts = chat_db.counts()
+        if counts is not None:
             print("✓ Database connection test successful")
             
-            # Test basic operations
-            session_count = chat_db.get_session_count()
-            message_count = chat_db.get_message_count()
+            session_count, message_count = counts
             
             print(f"✓ Current sessions: {session_count}")
             print(f"✓ Current messages: {message_count}")
@@ -4,31 +4,159 @@ Service Monitor - Continuous monitoring of IP addresses and ports
 Pings services every second and logs results with persistence
 """
 
+import asyncio
 import json
+import hashlib
+import orjson
 import socket
+import struct
 import time
 import os
 import sys
+import random
+import ipaddress
 from datetime import datetime
 from typing import List, Dict, Tuple
 import threading
 import signal
-import urllib.request
-import urllib.error
+import httpx
+
+# Seconds a hostname lookup is reused before resolving again (IP literals never expire)
+DNS_TTL = 300
+
+# Binary log record: service index, unix time, alive flag
+RECORD = struct.Struct('<HIB')
+
+# Binary log header: magic, generation (matched against the checkpoint's log_generation)
+LOG_HEADER = struct.Struct('<4sQ')
+LOG_MAGIC = b'SMLG'
+
+# TCP flags in SYN probe replies
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_SYN_ACK = 0x12
+
+class SynProber:
+    """Half-open TCP probes over one raw socket (needs root or CAP_NET_RAW)"""
+    
+    def __init__(self, loop):
+        self._loop = loop
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_TCP)
+        self._sock.setblocking(False)
+        self._pending = {}  # (ip, port, source port) -> future resolved with reply flags
+        self._sources = {}  # destination ip -> local source ip
+        self._next_port = random.randint(40000, 60000)
+        loop.add_reader(self._sock.fileno(), self._on_readable)
+    
+    @classmethod
+    def open(cls, loop):
+        """Return a prober, or None when raw sockets are not permitted or not supported"""
+        # BSD-derived kernels (macOS included) never deliver inbound TCP to raw sockets
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            return cls(loop)
+        except PermissionError:
+            return None
+    
+    def close(self):
+        self._loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+    
+    def _source_ip(self, ip: str) -> str:
+        """Local address the kernel routes to ip from, needed for the TCP checksum"""
+        source = self._sources.get(ip)
+        if source is None:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp:
+                udp.connect((ip, 9))
+                source = udp.getsockname()[0]
+            self._sources[ip] = source
+        return source
+    
+    @staticmethod
+    def _checksum(data: bytes) -> int:
+        if len(data) % 2:
+            data += b'\0'
+        total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+        while total >> 16:
+            total = (total & 0xFFFF) + (total >> 16)
+        return ~total & 0xFFFF
+    
+    def _syn_segment(self, source: str, ip: str, sport: int, port: int) -> bytes:
+        """Build a bare SYN; the kernel adds the IP header"""
+        header = struct.pack('!HHIIBBHHH', sport, port, random.getrandbits(32), 0, 5 << 4, TCP_SYN, 1024, 0, 0)
+        pseudo = socket.inet_aton(source) + socket.inet_aton(ip) + struct.pack('!BBH', 0, socket.IPPROTO_TCP, len(header))
+        return header[:16] + struct.pack('!H', self._checksum(pseudo + header)) + header[18:]
+    
+    def _on_readable(self):
+        """Match incoming TCP segments to pending probes"""
+        while True:
+            try:
+                packet = self._sock.recv(65535)
+            except (BlockingIOError, InterruptedError):
+                return
+            
+            ihl = (packet[0] & 0x0F) * 4
+            if len(packet) < ihl + 14:
+                continue
+            sport, dport = struct.unpack_from('!HH', packet, ihl)
+            future = self._pending.get((socket.inet_ntoa(packet[12:16]), sport, dport))
+            if future is not None and not future.done():
+                future.set_result(packet[ihl + 13])
+    
+    async def probe(self, sockaddr: Tuple, timeout: int = 5) -> Tuple[bool, str]:
+        """Send one SYN and wait for SYN-ACK (open) or RST (closed)"""
+        ip, port = sockaddr[:2]
+        sport = self._next_port
+        self._next_port = 40000 if sport >= 60999 else sport + 1
+        
+        key = (ip, port, sport)
+        self._pending[key] = future = self._loop.create_future()
+        try:
+            # The kernel answers the SYN-ACK with a RST, so no connection is left behind
+            self._sock.sendto(self._syn_segment(self._source_ip(ip), ip, sport, port), (ip, 0))
+            flags = await asyncio.wait_for(future, timeout)
+        finally:
+            del self._pending[key]
+        
+        if flags & TCP_SYN_ACK == TCP_SYN_ACK:
+            return True, "Connected successfully (SYN-ACK)"
+        if flags & TCP_RST:
+            return False, "Connection failed (RST)"
+        return False, f"Connection failed (TCP flags {flags:#04x})"
 
 class ServiceMonitor:
-    def __init__(self, config_file="monitor_config.json", results_file="monitor_results.json"):
+    def __init__(self, config_file="monitor_config.json", results_file="monitor_results.json", lazy=False):
         self.config_file = config_file
         self.results_file = results_file
         self.services = []
         self.running = False
         self.success_counts = {}  # Store success counts per IP:port
+        self.log_file = results_file + '.bin'  # Append-only probe log between checkpoints
+        self._log = None
+        self._log_generation = 0  # Bumped by every checkpoint, written to the log header
+        self.flush_interval = 30  # Seconds between results file checkpoints
+        self.pretty_results = False  # Indent the results file for human readers
+        self.syn_probe = False  # Probe plain ports with raw SYNs instead of full connects
+        self._syn = None
+        self._last_hash = b''  # Digest of the last checkpointed counts
+        self._last_flush = 0.0
+        self._addresses = {}  # (ip, port) -> (resolved socket address, expiry)
+        self.http = None  # Created on the event loop in run()
         
         # Load configuration
         self.load_config()
         
-        # Load previous results if they exist
-        self.load_previous_state()
+        # Load previous results if they exist (CLI subcommands that don't monitor skip this)
+        if not lazy:
+            self.load_previous_state()
+        
+        # Precompute per-service keys and the results file details
+        self.prepare_services()
+        
+        # Append probe records to the binary log, checkpointing anything replayed from it
+        if not lazy:
+            self.open_log()
         
         # Setup signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self.signal_handler)
@@ -41,6 +169,9 @@ class ServiceMonitor:
                 with open(self.config_file, 'r') as f:
                     config = json.load(f)
                     self.services = config.get('services', [])
+                    self.flush_interval = config.get('flush_interval', 30)
+                    self.pretty_results = config.get('pretty_results', False)
+                    self.syn_probe = config.get('syn_probe', False)
                     print(f"Loaded {len(self.services)} services from config")
             else:
                 # Create default configuration
@@ -63,7 +194,8 @@ class ServiceMonitor:
         config = {
             "services": default_services,
             "check_interval": 1,
-            "timeout": 5
+            "timeout": 5,
+            "flush_interval": 30
         }
         
         with open(self.config_file, 'w') as f:
@@ -72,154 +204,288 @@ class ServiceMonitor:
         self.services = default_services
         print(f"Created default config with {len(default_services)} services")
     
+    def prepare_services(self):
+        """Attach each service's IP:port key and build the cached service details"""
+        self._service_details = {}
+        for index, service in enumerate(self.services):
+            key = f"{service['ip']}:{service['port']}"
+            service['_key'] = key
+            service['_prefix'] = f"{service['name']} ({key})"  # Status line label
+            service['_index'] = index  # Service id in binary log records
+            self._service_details[key] = {
+                "name": service['name'],
+                "ip": service['ip'],
+                "port": service['port'],
+                "successful_pings": self.success_counts.get(key, 0)
+            }
+    
+    def open_log(self):
+        """Open the binary probe log for appending"""
+        self._log = open(self.log_file, 'ab', buffering=1 << 16)
+        
+        # Fold replayed records into a fresh checkpoint, which starts a new log generation
+        self.save_results()
+    
+    def rotate_log(self):
+        """Empty the probe log and start it at the current generation"""
+        self._log.truncate(0)
+        self._log.write(LOG_HEADER.pack(LOG_MAGIC, self._log_generation))
+        self._log.flush()
+    
+    def read_log(self) -> Tuple[int, bytes]:
+        """Return the probe log's generation and its complete records, or (-1, b'') without a valid log"""
+        try:
+            with open(self.log_file, 'rb') as f:
+                buf = f.read()
+        except FileNotFoundError:
+            return -1, b''
+        
+        if len(buf) < LOG_HEADER.size:
+            return -1, b''
+        magic, generation = LOG_HEADER.unpack_from(buf)
+        if magic != LOG_MAGIC:
+            return -1, b''
+        
+        # Drop a partial record left by a crash
+        end = len(buf) - (len(buf) - LOG_HEADER.size) % RECORD.size
+        return generation, buf[LOG_HEADER.size:end]
+    
+    def replay_log(self, data: Dict, counts: Dict[str, int]) -> Tuple[int, int]:
+        """Add successes logged after the checkpoint in data, returns (replayed, log generation)"""
+        generation, records = self.read_log()
+        
+        # An older generation was already counted by the checkpoint that replaced it
+        if generation < data.get('log_generation', 0):
+            return 0, generation
+        
+        keys = data.get('log_keys', [])
+        replayed = 0
+        for index, _, is_alive in RECORD.iter_unpack(records):
+            if is_alive and index < len(keys):
+                counts[keys[index]] = counts.get(keys[index], 0) + 1
+                replayed += 1
+        return replayed, generation
+    
+    async def resolve(self, ip: str, port: int) -> Tuple:
+        """Resolve an address and cache (family, type, proto, sockaddr) for DNS_TTL seconds"""
+        cached = self._addresses.get((ip, port))
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        
+        # Looked up in the loop's executor so a slow DNS server never stalls the other probes
+        family, socktype, proto, _, sockaddr = (await asyncio.get_running_loop().getaddrinfo(
+            ip, port, family=socket.AF_INET, type=socket.SOCK_STREAM
+        ))[0]
+        address = (family, socktype, proto, sockaddr)
+        self._addresses[(ip, port)] = (address, self.address_expiry(ip))
+        return address
+    
+    @staticmethod
+    def address_expiry(ip: str) -> float:
+        """IP literals can't change, hostnames are looked up again after DNS_TTL"""
+        try:
+            ipaddress.ip_address(ip)
+            return float('inf')
+        except ValueError:
+            return time.monotonic() + DNS_TTL
+    
     def load_previous_state(self):
         """Load previous success counts from results file"""
         if not os.path.exists(self.results_file):
             print("No previous results file found, starting fresh")
             self.success_counts = {}
+            self._log_generation = max(self.read_log()[0], 0)
             return
         
         try:
-            with open(self.results_file, 'r') as f:
-                data = json.load(f)
-                self.success_counts = data.get('success_counts', {})
+            # One read and an orjson parse; service_details is rebuilt in prepare_services
+            with open(self.results_file, 'rb') as f:
+                data = orjson.loads(f.read())
+            self.success_counts = data.get('success_counts', {})
+            
+            # Records written after the last checkpoint
+            replayed, generation = self.replay_log(data, self.success_counts)
+            self._log_generation = max(generation, data.get('log_generation', 0))
+            if replayed:
+                print(f"Replayed {replayed} successful pings from {self.log_file}")
                 
             total_successes = sum(self.success_counts.values())
             print(f"Loaded previous state: {len(self.success_counts)} services, {total_successes} total successful pings")
             
-            # Display current counts
-            for service_key, count in self.success_counts.items():
-                print(f"  {service_key}: {count} successful pings")
+            # Display current counts in a single write
+            if self.success_counts:
+                sys.stdout.write('\n'.join(
+                    f"  {service_key}: {count} successful pings"
+                    for service_key, count in self.success_counts.items()
+                ) + '\n')
                 
         except Exception as e:
             print(f"Error loading previous state: {e}")
             self.success_counts = {}
     
-    def check_http_service(self, ip: str, port: int, timeout: int = 5) -> Tuple[bool, float, str]:
+    async def check_http_service(self, ip: str, port: int, timeout: int = 5) -> Tuple[bool, float, str]:
         """Check if HTTP service is alive by requesting the page"""
         start_time = time.time()
         
         try:
             url = f"http://{ip}:{port}/"
+            response = await self.http.get(url, timeout=timeout)
+            response_time = (time.time() - start_time) * 1000
+            status_code = response.status_code
             
-            # Create request with timeout
-            req = urllib.request.Request(url)
-            req.add_header('User-Agent', 'ServiceMonitor/1.0')
-            
-            with urllib.request.urlopen(req, timeout=timeout) as response:
-                response_time = (time.time() - start_time) * 1000
-                status_code = response.getcode()
-                
-                if 200 <= status_code < 400:
-                    return True, response_time, f"HTTP {status_code} - Page loaded successfully"
-                else:
-                    return False, response_time, f"HTTP {status_code} - Unexpected status code"
+            if 200 <= status_code < 400:
+                return True, response_time, f"HTTP {status_code} - Page loaded successfully"
+            elif status_code >= 400:
+                return False, response_time, f"HTTP {status_code} - {response.reason_phrase}"
+            else:
+                return False, response_time, f"HTTP {status_code} - Unexpected status code"
                     
-        except urllib.error.HTTPError as e:
+        except httpx.ConnectError as e:
             response_time = (time.time() - start_time) * 1000
-            return False, response_time, f"HTTP {e.code} - {e.reason}"
-        except urllib.error.URLError as e:
-            response_time = (time.time() - start_time) * 1000
-            return False, response_time, f"URL Error: {e.reason}"
+            return False, response_time, f"URL Error: {e}"
         except Exception as e:
             response_time = (time.time() - start_time) * 1000
             return False, response_time, f"HTTP Error: {e}"
     
-    def check_health_service(self, ip: str, port: int, timeout: int = 5) -> Tuple[bool, float, str]:
+    async def check_health_service(self, ip: str, port: int, timeout: int = 5) -> Tuple[bool, float, str]:
         """Check service health via health endpoint or socket connection"""
         start_time = time.time()
         
         # First try health endpoint
         try:
             health_url = f"http://{ip}:{port}/health"
-            req = urllib.request.Request(health_url)
-            req.add_header('User-Agent', 'ServiceMonitor/1.0')
+            response = await self.http.get(health_url, timeout=timeout)
+            response_time = (time.time() - start_time) * 1000
+            status_code = response.status_code
             
-            with urllib.request.urlopen(req, timeout=timeout) as response:
-                response_time = (time.time() - start_time) * 1000
-                status_code = response.getcode()
-                
-                if status_code == 200:
-                    return True, response_time, "Health check passed"
-                else:
-                    return False, response_time, f"Health check failed - HTTP {status_code}"
+            if status_code == 200:
+                return True, response_time, "Health check passed"
+            elif status_code < 400:
+                return False, response_time, f"Health check failed - HTTP {status_code}"
+            else:
+                # Error statuses fall back to the socket check below
+                response.raise_for_status()
                     
         except:
             # Fall back to socket connection check
             try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(timeout)
-                
-                result = sock.connect_ex((ip, port))
-                sock.close()
-                
-                response_time = (time.time() - start_time) * 1000
-                
-                if result == 0:
-                    return True, response_time, "Socket connection successful"
-                else:
-                    return False, response_time, f"Connection failed (error {result})"
-                    
+                address = await self.resolve(ip, port)
             except Exception as e:
                 response_time = (time.time() - start_time) * 1000
                 return False, response_time, f"Connection error: {e}"
+            
+            is_alive, _, message = await self.check_socket_service(address, timeout)
+            response_time = (time.time() - start_time) * 1000
+            
+            if is_alive:
+                return True, response_time, "Socket connection successful"
+            return False, response_time, message
     
-    def check_service(self, service: Dict, timeout: int = 5) -> Tuple[bool, float, str]:
+    async def check_socket_service(self, address: Tuple, timeout: int = 5,
+                                   _time=time.time, _socket=socket.socket, _AF_INET=socket.AF_INET,
+                                   _wait_for=asyncio.wait_for) -> Tuple[bool, float, str]:
+        """Check if a TCP connection to a resolved address succeeds"""
+        # Module attributes are bound as default args so the probe path uses fast locals
+        start_time = _time()
+        loop = asyncio.get_running_loop()
+        
+        try:
+            family, socktype, proto, sockaddr = address
+            
+            if self._syn is not None and family == _AF_INET:
+                is_alive, message = await self._syn.probe(sockaddr, timeout)
+                return is_alive, (_time() - start_time) * 1000, message
+            
+            sock = _socket(family, socktype, proto)
+            sock.setblocking(False)
+            
+            try:
+                await _wait_for(loop.sock_connect(sock, sockaddr), timeout)
+            finally:
+                sock.close()
+            
+            response_time = (_time() - start_time) * 1000
+            return True, response_time, "Connected successfully"
+            
+        except asyncio.TimeoutError:
+            response_time = (_time() - start_time) * 1000
+            return False, response_time, "Connection failed (timed out)"
+        except OSError as e:
+            response_time = (_time() - start_time) * 1000
+            if e.errno is not None:
+                return False, response_time, f"Connection failed (error {e.errno})"
+            return False, response_time, f"Connection error: {e}"
+        except Exception as e:
+            response_time = (_time() - start_time) * 1000
+            return False, response_time, f"Connection error: {e}"
+    
+    async def check_service(self, service: Dict, timeout: int = 5) -> Tuple[bool, float, str]:
         """Check service based on port type"""
         ip = service['ip']
         port = service['port']
         
         if port == 5000:
             # HTTP page load check
-            return self.check_http_service(ip, port, timeout)
+            return await self.check_http_service(ip, port, timeout)
         elif port == 5001:
             # Health check
-            return self.check_health_service(ip, port, timeout)
+            return await self.check_health_service(ip, port, timeout)
         else:
             # Default socket connection check
-            start_time = time.time()
             try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(timeout)
-                
-                result = sock.connect_ex((ip, port))
-                sock.close()
-                
-                response_time = (time.time() - start_time) * 1000
-                
-                if result == 0:
-                    return True, response_time, "Connected successfully"
-                else:
-                    return False, response_time, f"Connection failed (error {result})"
-                    
+                # Cached lookup, getaddrinfo only runs again once a hostname's entry expires
+                address = await self.resolve(ip, port)
             except Exception as e:
-                response_time = (time.time() - start_time) * 1000
-                return False, response_time, f"Connection error: {e}"
+                return False, 0.0, f"Connection error: {e}"
+            return await self.check_socket_service(address, timeout)
     
-    def log_result(self, service: Dict, is_alive: bool, response_time: float, message: str):
-        """Update success count and save to file"""
-        timestamp = datetime.now().isoformat()
-        service_key = f"{service['ip']}:{service['port']}"
+    def log_result(self, service: Dict, is_alive: bool, response_time: float, message: str, timestamp: str,
+                   record_time: int, _pack=RECORD.pack):
+        """Update success count (persisted at the end of the cycle)"""
+        # Bind per-call lookups once
+        service_key = service['_key']
+        counts = self.success_counts
+        log = self._log
+        
+        if log is not None:
+            log.write(_pack(service['_index'], record_time, is_alive))
         
         # Update success count only if service is alive
+        count = counts.get(service_key, 0)
         if is_alive:
-            if service_key not in self.success_counts:
-                self.success_counts[service_key] = 0
-            self.success_counts[service_key] += 1
-        
-        # Save updated counts to file
-        self.save_results()
+            count += 1
+            counts[service_key] = count
+            self._service_details[service_key]['successful_pings'] = count
         
         # Print status with current success count
-        status = "✓" if is_alive else "✗"
-        current_count = self.success_counts.get(service_key, 0)
-        print(f"{timestamp} {status} {service['name']} ({service_key}) - {response_time:.1f}ms - {message} [Total successful: {current_count}]")
+        print(f"{timestamp} {'✓' if is_alive else '✗'} {service['_prefix']} - {response_time:.1f}ms - {message} [Total successful: {count}]")
     
-    def monitor_cycle(self):
+    async def monitor_cycle(self):
         """Perform one monitoring cycle for all services"""
-        for service in self.services:
-            is_alive, response_time, message = self.check_service(service)
-            self.log_result(service, is_alive, response_time, message)
+        # Probe all services concurrently on the event loop, then log results in config order
+        results = await asyncio.gather(
+            *[self.check_service(service) for service in self.services],
+            return_exceptions=True
+        )
+        
+        # One timestamp per cycle rather than formatting one per service
+        now = datetime.now()
+        timestamp = now.isoformat()
+        record_time = int(now.timestamp())
+        for service, result in zip(self.services, results):
+            # An unexpected error fails that probe instead of ending the run
+            if isinstance(result, Exception):
+                result = (False, 0.0, f"Check error: {result}")
+            is_alive, response_time, message = result
+            self.log_result(service, is_alive, response_time, message, timestamp, record_time)
+        
+        # One write per cycle to the probe log
+        if self._log is not None:
+            self._log.flush()
+        
+        # Checkpoint the JSON view at most every flush_interval seconds
+        if time.time() - self._last_flush >= self.flush_interval:
+            self.save_results()
     
     def start_monitoring(self):
         """Start continuous monitoring"""
@@ -236,28 +502,52 @@ class ServiceMonitor:
         print("Status format: [timestamp] [status] [service] - [response_time] - [message]")
         print("="*60)
         
+        try:
+            asyncio.run(self.run())
+        except KeyboardInterrupt:
+            print("\nShutdown requested...")
+        finally:
+            self.stop_monitoring()
+    
+    async def run(self):
+        """Run monitoring cycles on one event loop until stopped"""
+        # Keep-alive client so HTTP probes reuse connections across cycles
+        self.http = httpx.AsyncClient(
+            headers={'User-Agent': 'ServiceMonitor/1.0'},
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=32)
+        )
+        
+        if self.syn_probe:
+            self._syn = SynProber.open(asyncio.get_running_loop())
+            if self._syn is None:
+                print("SYN probes need Linux and root or CAP_NET_RAW, using TCP connects instead")
+        
         try:
             while self.running:
                 start_time = time.time()
                 
                 # Perform monitoring cycle
-                self.monitor_cycle()
+                await self.monitor_cycle()
                 
                 # Calculate sleep time to maintain 1-second intervals
                 elapsed = time.time() - start_time
                 sleep_time = max(0, 1.0 - elapsed)
                 
                 if sleep_time > 0:
-                    time.sleep(sleep_time)
-                
-        except KeyboardInterrupt:
-            print("\nShutdown requested...")
+                    await asyncio.sleep(sleep_time)
         finally:
-            self.stop_monitoring()
+            if self._syn is not None:
+                self._syn.close()
+                self._syn = None
+            await self.http.aclose()
     
     def stop_monitoring(self):
         """Stop monitoring gracefully"""
         self.running = False
+        self.save_results()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
         print("\nMonitoring stopped")
         print(f"Results saved to: {self.results_file}")
     
@@ -268,27 +558,39 @@ class ServiceMonitor:
         sys.exit(0)
     
     def save_results(self):
-        """Save success counts to file"""
+        """Checkpoint success counts to the results file and empty the probe log"""
         try:
-            # Create service mapping for display
-            service_details = {}
-            for service in self.services:
-                key = f"{service['ip']}:{service['port']}"
-                service_details[key] = {
-                    "name": service['name'],
-                    "ip": service['ip'],
-                    "port": service['port'],
-                    "successful_pings": self.success_counts.get(key, 0)
-                }
-            
             data = {
-                "last_updated": datetime.now().isoformat(),
                 "success_counts": self.success_counts,
-                "service_details": service_details
+                "service_details": self._service_details,
+                "log_keys": [service['_key'] for service in self.services]
             }
             
-            with open(self.results_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            # Records logged from here on belong to the next generation
+            self._log_generation += 1
+            
+            # Skip the write when the counts match the last checkpoint (e.g. every service down)
+            digest = hashlib.blake2b(orjson.dumps(data), digest_size=16).digest()
+            if digest != self._last_hash:
+                data = {"last_updated": datetime.now(), **data, "log_generation": self._log_generation}
+                
+                # Write to a temp file and rename so readers never see a partial file
+                buf = orjson.dumps(data, option=orjson.OPT_INDENT_2 if self.pretty_results else 0)
+                
+                tmp_file = self.results_file + '.tmp'
+                with open(tmp_file, 'wb', buffering=1 << 16) as f:
+                    f.write(buf)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, self.results_file)
+                self._last_hash = digest
+            
+            # Rotate only after the checkpoint is in place: if a crash leaves the old log
+            # behind, its older generation tells replay that it is already counted
+            if self._log is not None:
+                self.rotate_log()
+            
+            self._last_flush = time.time()
                 
         except Exception as e:
             print(f"Error saving results: {e}")
@@ -307,6 +609,11 @@ class ServiceMonitor:
             service_details = data.get('service_details', {})
             last_updated = data.get('last_updated', 'Unknown')
             
+            # Include probes logged since the last checkpoint
+            if self.replay_log(data, success_counts)[0]:
+                for service_key, details in service_details.items():
+                    details['successful_pings'] = success_counts.get(service_key, 0)
+            
             total_successes = sum(success_counts.values())
             
             print("="*60)
@@ -317,9 +624,11 @@ class ServiceMonitor:
             print(f"Services monitored: {len(success_counts)}")
             print("\nSuccess counts per service:")
             
-            for service_key, details in service_details.items():
-                print(f"  {details['name']} ({service_key}):")
-                print(f"    Successful pings: {details['successful_pings']}")
+            if service_details:
+                sys.stdout.write('\n'.join(
+                    f"  {details['name']} ({service_key}):\n    Successful pings: {details['successful_pings']}"
+                    for service_key, details in service_details.items()
+                ) + '\n')
             
         except Exception as e:
             print(f"Error calculating stats: {e}")
@@ -328,11 +637,12 @@ def main():
     """Main function"""
     if len(sys.argv) > 1:
         if sys.argv[1] == "stats":
-            monitor = ServiceMonitor()
+            # show_stats reads the results file itself
+            monitor = ServiceMonitor(lazy=True)
             monitor.show_stats()
             return
         elif sys.argv[1] == "config":
-            monitor = ServiceMonitor()
+            monitor = ServiceMonitor(lazy=True)
             print(f"Config file: {monitor.config_file}")
             print(f"Services: {len(monitor.services)}")
             for service in monitor.services:
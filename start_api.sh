@@ -45,4 +45,4 @@ echo "=========================="
 
 # Start the API server on port 5001
 export FLASK_PORT=5001
-python api_app.py
\ No newline at end of file
+gunicorn -c gunicorn.conf.py api_app:app
\ No newline at end of file
@@ -178,7 +178,7 @@ trap cleanup INT TERM
 
 # Start the Flask application on port 5000
 export FLASK_PORT=5000
-python3 app.py
+gunicorn -c gunicorn.conf.py app:app
 
 # Cleanup on normal exit
 cleanup
\ No newline at end of file